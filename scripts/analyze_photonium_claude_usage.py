@@ -4,89 +4,132 @@ Analyze Claude Code usage patterns for Photonium optical design AI development.
 Generates actionable insights to improve development efficiency and reduce costs.
 """
 
+import hashlib
+import io
 import json
 import os
-from typing import List, Dict, Tuple, Optional
+import re
+import shelve
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional
 from datetime import datetime
-from collections import defaultdict
-import pandas as pd
+from collections import Counter, defaultdict
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 
 # Set tokenizers parallelism before importing transformers
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
 import argparse
 from pathlib import Path
-from openai import OpenAI
+
+# BERTopic, sentence-transformers, sklearn and openai are imported inside the functions that
+# use them, so --help, bad paths and the log-parsing workers don't pay their import cost
+if TYPE_CHECKING:
+    from bertopic import BERTopic
+    from sentence_transformers import SentenceTransformer
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Prompts to skip: interrupted requests, system messages, and command-like prompts.
+# One compiled pattern replaces a chain of substring/startswith checks per prompt.
+_REJECT_RE = re.compile(
+    r"\A(?:\[Request interrupted|System:|<system-reminder>)"
+    r"|\[Request interrupted by user\]"
+    r"|(?i:ultrathink)"
+    r"|--use-todos"
+)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Below this many prompts, TruncatedSVD + KMeans replace UMAP + HDBSCAN
+SMALL_CORPUS_SIZE = 5000
+
+# On-disk embedding cache so re-runs only encode prompts not seen before
+EMBEDDING_CACHE_PATH = Path("~/.cache/photonium_embeds").expanduser()
+
+# Persistent O3 classification cache keyed by topic words + sample prompts
+O3_CACHE_PATH = Path("~/.cache/photonium_o3.json").expanduser()
+
+
+def _extract_from_file(log_file: str) -> List[Tuple[str, Dict]]:
+    """
+    Extract user prompts from a single Claude session log file.
+    """
+    prompts = []
+    
+    try:
+        with open(log_file, 'rb', buffering=1 << 20) as f:
+            # Stream as JSONL (one JSON per line) and parse the raw bytes directly
+            for line_num, line in enumerate(f, 1):
+                line = line.rstrip(b'\n')
+                if not line.strip():
+                    continue
+                try:
+                    entry = _json_loads(line)
+                    
+                    # Check if this is a user message
+                    if (entry.get('type') == 'user' or 
+                        (entry.get('message', {}).get('role') == 'user')):
+                        
+                        # Extract content
+                        message = entry.get('message', {})
+                        content_raw = message.get('content', '')
+                        
+                        # Handle different content formats
+                        if isinstance(content_raw, str):
+                            prompt_text = content_raw
+                        elif isinstance(content_raw, list):
+                            # Extract text from content blocks
+                            texts = []
+                            for block in content_raw:
+                                if isinstance(block, dict) and block.get('text'):
+                                    texts.append(block['text'])
+                            prompt_text = ' '.join(texts)
+                        else:
+                            continue
+                        
+                        if prompt_text.strip():
+                            # Filter out system messages, interrupted requests, and command-like prompts
+                            if not _REJECT_RE.search(prompt_text):
+                                metadata = {
+                                    'timestamp': entry.get('timestamp'),
+                                    'session_id': entry.get('sessionId'),
+                                    'file': log_file,
+                                    'line': line_num
+                                }
+                                prompts.append((prompt_text.strip(), metadata))
+                            
+                except ValueError:
+                    # Skip malformed lines (JSONDecodeError or bad UTF-8)
+                    continue
+                    
+    except Exception as e:
+        print(f"Error processing {log_file}: {e}")
+    
+    return prompts
 
 
 def extract_user_prompts(log_files: List[str]) -> List[Tuple[str, Dict]]:
     """
     Extract user prompts from Claude session log files.
     
+    Files are parsed in parallel worker processes since each one is independent.
+    
     Returns list of tuples: (prompt_text, metadata)
     """
-    prompts = []
+    # A single file isn't worth the process startup cost
+    if len(log_files) == 1:
+        return _extract_from_file(log_files[0])
     
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                # Try different parsing strategies
-                content = f.read()
-                
-                # Try parsing as JSONL (one JSON per line)
-                if content.strip():
-                    for line_num, line in enumerate(content.strip().split('\n'), 1):
-                        if not line.strip():
-                            continue
-                        try:
-                            entry = json.loads(line)
-                            
-                            # Check if this is a user message
-                            if (entry.get('type') == 'user' or 
-                                (entry.get('message', {}).get('role') == 'user')):
-                                
-                                # Extract content
-                                message = entry.get('message', {})
-                                content_raw = message.get('content', '')
-                                
-                                # Handle different content formats
-                                if isinstance(content_raw, str):
-                                    prompt_text = content_raw
-                                elif isinstance(content_raw, list):
-                                    # Extract text from content blocks
-                                    texts = []
-                                    for block in content_raw:
-                                        if isinstance(block, dict) and block.get('text'):
-                                            texts.append(block['text'])
-                                    prompt_text = ' '.join(texts)
-                                else:
-                                    continue
-                                
-                                if prompt_text.strip():
-                                    # Filter out system messages, interrupted requests, and command-like prompts
-                                    if ("[Request interrupted by user]" not in prompt_text and 
-                                        not prompt_text.startswith("[Request interrupted") and
-                                        not prompt_text.startswith("System:") and
-                                        not prompt_text.startswith("<system-reminder>") and
-                                        "ultrathink" not in prompt_text.lower() and
-                                        "--use-todos" not in prompt_text):
-                                        metadata = {
-                                            'timestamp': entry.get('timestamp'),
-                                            'session_id': entry.get('sessionId'),
-                                            'file': log_file,
-                                            'line': line_num
-                                        }
-                                        prompts.append((prompt_text.strip(), metadata))
-                                    
-                        except json.JSONDecodeError:
-                            # Skip malformed lines
-                            continue
-                            
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-            continue
+    prompts = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for result in executor.map(_extract_from_file, log_files, chunksize=4):
+            prompts.extend(result)
     
     return prompts
 
@@ -109,31 +152,239 @@ def clean_prompts(prompts: List[str]) -> List[str]:
     return cleaned
 
 
-def analyze_prompts_with_bertopic(prompts: List[str], n_topics: int = 10) -> Tuple[BERTopic, List[int], List[float]]:
+def _load_cuml():
+    """
+    Return the optional RAPIDS cuML (UMAP, HDBSCAN) GPU classes, or (None, None) if cuML isn't installed.
+    """
+    try:
+        from cuml.manifold import UMAP as cuUMAP
+        from cuml.cluster import HDBSCAN as cuHDBSCAN
+    except ImportError:
+        return None, None
+    return cuUMAP, cuHDBSCAN
+
+
+def _nn_descent_bertopic_cls():
+    """
+    Build a BERTopic variant for cuML UMAP built with nn-descent.
+    
+    BERTopic fits and transforms in separate calls, but nn-descent needs a single
+    fit_transform with the data kept on host to avoid the all-pairs KNN graph.
+    """
+    from bertopic import BERTopic
+    
+    class NNDescentBERTopic(BERTopic):
+        def _reduce_dimensionality(self, embeddings, y=None, partial_fit=False):
+            if partial_fit:
+                return super()._reduce_dimensionality(embeddings, y, partial_fit)
+            umap_embeddings = self.umap_model.fit_transform(embeddings, data_on_host=True)
+            return np.nan_to_num(umap_embeddings)
+    
+    return NNDescentBERTopic
+
+
+def load_or_encode_embeddings(prompts: List[str], embedding_model: 'SentenceTransformer') -> np.ndarray:
+    """
+    Look up prompt embeddings in the on-disk cache and encode only the misses.
+    
+    Entries are keyed by a hash of the model name and prompt text.
+    """
+    keys = [
+        hashlib.blake2b(f"{EMBEDDING_MODEL_NAME}\0{p}".encode(), digest_size=16).hexdigest()
+        for p in prompts
+    ]
+    dim = embedding_model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(prompts), dim), dtype=np.float32)
+    
+    EMBEDDING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with shelve.open(str(EMBEDDING_CACHE_PATH)) as cache:
+        miss_idx = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None and len(cached) == dim * 4:
+                embeddings[i] = np.frombuffer(cached, dtype=np.float32)
+            else:
+                miss_idx.append(i)
+        
+        print(f"Embedding cache: {len(prompts) - len(miss_idx)} hits, {len(miss_idx)} misses")
+        
+        if miss_idx:
+            # encode() already sorts its inputs by length before batching, which keeps padding low
+            new_embeddings = embedding_model.encode(
+                [prompts[i] for i in miss_idx],
+                batch_size=128,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            for i, emb in zip(miss_idx, new_embeddings):
+                embeddings[i] = emb
+                cache[keys[i]] = emb.astype(np.float32).tobytes()
+    
+    return embeddings
+
+
+def tfidf_embeddings(prompts: List[str]) -> np.ndarray:
+    """
+    Cheap CPU embeddings: TF-IDF over unigrams/bigrams reduced to dense vectors with TruncatedSVD.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
+    # min_df=5 would prune away the whole vocabulary on small corpora
+    vectorizer = TfidfVectorizer(
+        min_df=5 if len(prompts) > 500 else 1,
+        ngram_range=(1, 2),
+        sublinear_tf=True
+    )
+    tfidf = vectorizer.fit_transform(prompts)
+    n_components = min(100, tfidf.shape[1] - 1)
+    return TruncatedSVD(n_components=n_components, random_state=0).fit_transform(tfidf).astype(np.float32)
+
+
+def analyze_prompts_with_bertopic(
+    prompts: List[str],
+    n_topics: int = 10,
+    cpu_fast: bool = False
+) -> Tuple['BERTopic', List[int], List[float]]:
     """
     Use BERTopic to cluster prompts into topics.
+    
+    With cpu_fast, TF-IDF embeddings replace the sentence transformer.
     """
+    from bertopic import BERTopic
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA, TruncatedSVD
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    if cpu_fast:
+        embedding_model = None
+        embeddings = tfidf_embeddings(prompts)
+    else:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        
+        # Precompute embeddings (on GPU when available) so BERTopic skips its internal encoder
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME, device=device)
+        embeddings = load_or_encode_embeddings(prompts, embedding_model)
+        
+        # Shrink the 384-D embeddings before UMAP; its KNN graph build scales with dimensionality
+        if len(prompts) > 50:
+            embeddings = PCA(n_components=50, svd_solver='randomized', random_state=42).fit_transform(embeddings).astype(np.float32)
+    
     # Configure BERTopic
+    # Cap the trigram vocabulary and use int32 counts to bound c-TF-IDF memory. BERTopic needs
+    # get_feature_names_out() for topic words, so a HashingVectorizer can't be used here.
     vectorizer_model = CountVectorizer(
         ngram_range=(1, 3),
         stop_words="english",
-        min_df=2
+        min_df=2,
+        max_features=2**18,
+        dtype=np.int32
     )
     
-    topic_model = BERTopic(
+    # Pick the dimensionality reduction + clustering backends; None falls back to BERTopic's
+    # CPU UMAP/HDBSCAN defaults
+    umap_model = hdbscan_model = None
+    model_cls = BERTopic
+    nr_topics = n_topics
+    calculate_probabilities = True
+    if len(prompts) < SMALL_CORPUS_SIZE:
+        # Deterministic linear algebra is plenty for small corpora and avoids UMAP's JIT warm-up
+        umap_model = TruncatedSVD(n_components=min(5, embeddings.shape[1] - 1), random_state=42)
+        hdbscan_model = KMeans(n_clusters=min(n_topics, len(prompts)), random_state=42, n_init=10)
+        # KMeans yields exactly n_topics clusters and no probabilities
+        nr_topics = None
+        calculate_probabilities = False
+    else:
+        # Use GPU UMAP/HDBSCAN when cuML is installed
+        cuUMAP, cuHDBSCAN = _load_cuml()
+        if cuUMAP is not None:
+            # nn-descent approximates the KNN graph so memory grows linearly with corpus size
+            umap_model = cuUMAP(
+                n_neighbors=15,
+                n_components=5,
+                min_dist=0.0,
+                build_algo="nn_descent",
+                build_kwds={"nnd_graph_degree": 64}
+            )
+            hdbscan_model = cuHDBSCAN(min_cluster_size=3, prediction_data=True)
+            model_cls = _nn_descent_bertopic_cls()
+    
+    topic_model = model_cls(
+        embedding_model=embedding_model,
+        umap_model=umap_model,
+        hdbscan_model=hdbscan_model,
         vectorizer_model=vectorizer_model,
         min_topic_size=3,  # Minimum cluster size
-        nr_topics=n_topics,  # Reduce to n_topics
-        calculate_probabilities=True,
+        nr_topics=nr_topics,  # Reduce to n_topics
+        calculate_probabilities=calculate_probabilities,
         verbose=True
     )
     
     # Fit the model
-    topics, probs = topic_model.fit_transform(prompts)
+    topics, probs = topic_model.fit_transform(prompts, embeddings)
     
     return topic_model, topics, probs
 
 
+def _load_o3_cache() -> Dict:
+    """Load cached O3 classifications, starting empty if the cache is missing or corrupt."""
+    try:
+        with open(O3_CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_o3_cache(cache: Dict):
+    """Persist cached O3 classifications to disk."""
+    O3_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(O3_CACHE_PATH, 'w') as f:
+        json.dump(cache, f)
+
+
+# Loaded on first use rather than at import, so log-parsing worker processes never read it
+_o3_cache: Optional[Dict] = None
+_o3_cache_lock = threading.Lock()
+
+
+def _get_o3_cache() -> Dict:
+    """Return the in-memory O3 cache, loading it from disk on first use."""
+    global _o3_cache
+    with _o3_cache_lock:
+        if _o3_cache is None:
+            _o3_cache = _load_o3_cache()
+        return _o3_cache
+
+
+# Stable instructions shared by every classification call. Keeping them in the system
+# message means each request starts with an identical prefix that the API can cache;
+# only the per-cluster prompts, key terms and existing categories go in the user message.
+PATTERN_SYSTEM_PROMPT = """You analyze developer patterns for optical design AI systems and provide specific, actionable improvements. Return JSON.
+
+You will be given Claude Code prompts from a developer building Photonium, an AI-powered optical design system.
+They're migrating from Python/FastAPI to Next.js/Vercel, integrating AWS S3 for component databases, and building optical physics tools.
+
+Identify the SPECIFIC development pattern and provide ACTIONABLE insights for this optical design AI company.
+
+Consider patterns like:
+- "Testing optical component searches repeatedly" → Create test fixtures for S3 queries
+- "Debugging Vercel deployment failures" → Pre-deployment validation script needed
+- "Manually checking tool outputs" → Automated tool testing framework
+- "Iterating on beam calculations" → Standardized physics validation suite
+- "Environment configuration issues" → Configuration validation checklist
+- "Integration testing bottlenecks" → Mock S3/Supabase for local testing
+- "Repeated API debugging" → Better error handling and logging
+
+Return JSON with:
+- "category": A specific 3-6 word pattern name
+- "insight": What's actually happening (1-2 sentences)
+- "action": Specific action to take (1-2 sentences)
+- "impact": Expected time/cost savings (e.g., "Save 2 hours/week", "Reduce debugging by 40%")
+- "template": A Claude Code prompt template they should use for this type of task"""
+
+
 def classify_photonium_pattern(
     prompts: List[str], 
     topic_words: List[str],
@@ -142,7 +393,18 @@ def classify_photonium_pattern(
 ) -> Dict:
     """
     Use O3 to classify Photonium-specific development patterns and provide actionable insights.
+    
+    Results are cached on disk so re-runs with the same cluster skip the API call.
     """
+    # Sample prompts for analysis
+    sample_prompts = prompts[:5]
+    cache_key = hashlib.sha256(
+        (",".join(topic_words[:10]) + "|" + "|".join(p[:200] for p in sample_prompts)).encode()
+    ).hexdigest()
+    o3_cache = _get_o3_cache()
+    if cache_key in o3_cache:
+        return o3_cache[cache_key]
+    
     if not openai_key:
         openai_key = os.getenv('OPENAI_API_KEY')
     
@@ -155,46 +417,24 @@ def classify_photonium_pattern(
         }
     
     try:
+        from openai import OpenAI
+        
         client = OpenAI(api_key=openai_key)
         
-        # Sample prompts for analysis
-        sample_prompts = prompts[:5]
         existing_str = ""
         if existing_categories:
             existing_str = f"\nAlready identified patterns (find something different): {', '.join(existing_categories)}\n"
         
-        prompt = f"""Analyze these Claude Code prompts from a developer building Photonium, an AI-powered optical design system.
-They're migrating from Python/FastAPI to Next.js/Vercel, integrating AWS S3 for component databases, and building optical physics tools.
-
-{existing_str}
-
-Sample prompts from this cluster:
+        prompt = f"""Sample prompts from this cluster:
 {chr(10).join(f"- {p[:200]}" for p in sample_prompts)}
 
 Key terms: {', '.join(topic_words[:10])}
-
-Identify the SPECIFIC development pattern and provide ACTIONABLE insights for this optical design AI company.
-
-Consider patterns like:
-- "Testing optical component searches repeatedly" → Create test fixtures for S3 queries
-- "Debugging Vercel deployment failures" → Pre-deployment validation script needed
-- "Manually checking tool outputs" → Automated tool testing framework
-- "Iterating on beam calculations" → Standardized physics validation suite
-- "Environment configuration issues" → Configuration validation checklist
-- "Integration testing bottlenecks" → Mock S3/Supabase for local testing
-- "Repeated API debugging" → Better error handling and logging
-
-Return JSON with:
-- "category": A specific 3-6 word pattern name
-- "insight": What's actually happening (1-2 sentences)
-- "action": Specific action to take (1-2 sentences)
-- "impact": Expected time/cost savings (e.g., "Save 2 hours/week", "Reduce debugging by 40%")
-- "template": A Claude Code prompt template they should use for this type of task"""
+{existing_str}"""
         
         response = client.chat.completions.create(
             model="o3",
             messages=[
-                {"role": "system", "content": "You analyze developer patterns for optical design AI systems and provide specific, actionable improvements. Return JSON."},
+                {"role": "system", "content": PATTERN_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_completion_tokens=4000,
@@ -205,6 +445,9 @@ Return JSON with:
         
         try:
             parsed = json.loads(content)
+            with _o3_cache_lock:
+                o3_cache[cache_key] = parsed
+                _save_o3_cache(o3_cache)
             return parsed
         except:
             return {
@@ -224,17 +467,30 @@ Return JSON with:
         }
 
 
-def calculate_prompt_metrics(prompts: List[str], metadata: List[Dict]) -> Dict:
+def count_words(prompts: List[str]) -> np.ndarray:
+    """Word count of each prompt, computed in a single pass."""
+    return np.fromiter((len(p.split()) for p in prompts), dtype=np.int32, count=len(prompts))
+
+
+def calculate_prompt_metrics(
+    prompts: List[str],
+    metadata: List[Dict],
+    word_counts: Optional[np.ndarray] = None
+) -> Dict:
     """Calculate efficiency metrics for prompts."""
+    if word_counts is None:
+        word_counts = count_words(prompts)
+    sessions = {m.get('session_id', '') for m in metadata}
+    
     metrics = {
-        'avg_length': sum(len(p.split()) for p in prompts) / len(prompts),
+        'avg_length': float(word_counts.mean()),
         'total_prompts': len(prompts),
-        'unique_sessions': len(set(m.get('session_id', '') for m in metadata)),
-        'prompts_per_session': len(prompts) / len(set(m.get('session_id', 'default') for m in metadata))
+        'unique_sessions': len(sessions),
+        'prompts_per_session': len(prompts) / len(sessions)
     }
     
     # Estimate token usage (rough approximation)
-    total_tokens = sum(len(p.split()) * 1.3 for p in prompts)  # 1.3 tokens per word average
+    total_tokens = float(word_counts.sum()) * 1.3  # 1.3 tokens per word average
     metrics['estimated_tokens'] = int(total_tokens)
     metrics['estimated_cost'] = total_tokens * 0.00003  # Approximate cost per token
     
@@ -242,7 +498,7 @@ def calculate_prompt_metrics(prompts: List[str], metadata: List[Dict]) -> Dict:
 
 
 def generate_photonium_report(
-    topic_model: BERTopic, 
+    topic_model: 'BERTopic', 
     prompts: List[str], 
     topics: List[int],
     metadata: List[Dict],
@@ -252,36 +508,39 @@ def generate_photonium_report(
     """
     Generate a business-focused report for Photonium development optimization.
     """
-    report_lines = []
-    report_lines.append("# Photonium Claude Code Optimization Report")
-    report_lines.append(f"\n**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    # Write report lines straight into a buffer rather than collecting and joining a list
+    buf = io.StringIO()
     
-    # Calculate metrics
-    metrics = calculate_prompt_metrics(prompts, metadata)
+    def w(line: str):
+        buf.write(line)
+        buf.write("\n")
     
-    report_lines.append("\n## Executive Summary")
-    report_lines.append(f"\n- **Total Prompts Analyzed:** {metrics['total_prompts']}")
-    report_lines.append(f"- **Development Sessions:** {metrics['unique_sessions']}")
-    report_lines.append(f"- **Avg Prompts per Session:** {metrics['prompts_per_session']:.1f}")
-    report_lines.append(f"- **Estimated Monthly Token Cost:** ${metrics['estimated_cost'] * 30:.2f}")
-    report_lines.append(f"- **Potential Savings:** Up to 40% reduction in prompts with optimized workflows")
+    w("# Photonium Claude Code Optimization Report")
+    w(f"\n**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    report_lines.append("\n---\n")
+    # Calculate metrics
+    word_counts = count_words(prompts)
+    metrics = calculate_prompt_metrics(prompts, metadata, word_counts)
     
-    # Get topic info
-    topic_info = topic_model.get_topic_info()
-    topic_info = topic_info[topic_info.Topic != -1]  # Filter outliers
+    w("\n## Executive Summary")
+    w(f"\n- **Total Prompts Analyzed:** {metrics['total_prompts']}")
+    w(f"- **Development Sessions:** {metrics['unique_sessions']}")
+    w(f"- **Avg Prompts per Session:** {metrics['prompts_per_session']:.1f}")
+    w(f"- **Estimated Monthly Token Cost:** ${metrics['estimated_cost'] * 30:.2f}")
+    w(f"- **Potential Savings:** Up to 40% reduction in prompts with optimized workflows")
     
-    report_lines.append(f"\n## Top {min(5, len(topic_info))} Development Patterns & Optimization Opportunities\n")
+    w("\n---\n")
     
-    # Analyze top 5 topics with O3
-    o3_analyses = {}
-    existing_categories = []
+    # Rank topics by the per-prompt counts, ignoring outliers. BERTopic's own ordering only
+    # covers the deduplicated prompts, so it would rank repeated patterns too low.
+    topic_sizes = Counter(t for t in topics if t != -1)
+    top_topics = topic_sizes.most_common(5)
     
-    for idx, row in topic_info.head(5).iterrows():
-        topic_id = row['Topic']
-        topic_size = row['Count']
-        
+    w(f"\n## Top {len(top_topics)} Development Patterns & Optimization Opportunities\n")
+    
+    # Gather prompts and key words for the top 5 topics
+    topic_jobs = []
+    for idx, (topic_id, _) in enumerate(top_topics):
         # Get prompts for this topic
         topic_prompts = [p for p, t in zip(prompts, topics) if t == topic_id]
         
@@ -289,78 +548,95 @@ def generate_photonium_report(
         words = topic_model.get_topic(topic_id)
         top_words = [word for word, _ in words[:10]] if words else []
         
-        # Get O3 analysis
-        analysis = classify_photonium_pattern(topic_prompts, top_words, openai_key, existing_categories)
+        topic_jobs.append((idx, topic_id, topic_prompts, top_words))
+    
+    # Analyze top 5 topics with O3 concurrently (the calls are independent and network-bound)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [
+            executor.submit(classify_photonium_pattern, topic_prompts, top_words, openai_key)
+            for _, _, topic_prompts, top_words in topic_jobs
+        ]
+        analyses = [future.result() for future in futures]
+    
+    o3_analyses = {}
+    existing_categories = []
+    topics_arr = np.asarray(topics)
+    
+    for (idx, topic_id, topic_prompts, top_words), analysis in zip(topic_jobs, analyses):
+        topic_size = topic_sizes[topic_id]
+        
+        # Parallel calls can't see each other's categories, so disambiguate duplicates afterwards
+        if analysis['category'] in existing_categories and top_words:
+            analysis = {**analysis, 'category': f"{analysis['category']} ({top_words[0].title()})"}
         o3_analyses[topic_id] = analysis
         existing_categories.append(analysis['category'])
         
         # Calculate pattern cost
-        pattern_tokens = sum(len(p.split()) * 1.3 for p in topic_prompts)
+        pattern_tokens = float(word_counts[topics_arr == topic_id].sum()) * 1.3
         pattern_cost = pattern_tokens * 0.00003 * 30  # Monthly cost
         
-        report_lines.append(f"### Pattern {idx + 1}: {analysis['category']}")
-        report_lines.append(f"\n**Frequency:** {topic_size} prompts ({(topic_size / len(prompts) * 100):.1f}%)")
-        report_lines.append(f"**Monthly Cost:** ${pattern_cost:.2f}")
-        report_lines.append(f"\n**What's Happening:** {analysis.get('insight', 'Pattern identified')}")
-        report_lines.append(f"\n**Action Required:** {analysis.get('action', 'Review pattern')}")
-        report_lines.append(f"\n**Expected Impact:** {analysis.get('impact', 'Efficiency improvement')}")
+        w(f"### Pattern {idx + 1}: {analysis['category']}")
+        w(f"\n**Frequency:** {topic_size} prompts ({(topic_size / len(prompts) * 100):.1f}%)")
+        w(f"**Monthly Cost:** ${pattern_cost:.2f}")
+        w(f"\n**What's Happening:** {analysis.get('insight', 'Pattern identified')}")
+        w(f"\n**Action Required:** {analysis.get('action', 'Review pattern')}")
+        w(f"\n**Expected Impact:** {analysis.get('impact', 'Efficiency improvement')}")
         
         # Add template if available
         if 'template' in analysis and analysis['template']:
-            report_lines.append(f"\n**Optimized Prompt Template:**")
-            report_lines.append(f"```")
-            report_lines.append(analysis['template'])
-            report_lines.append(f"```")
+            w(f"\n**Optimized Prompt Template:**")
+            w(f"```")
+            w(analysis['template'])
+            w(f"```")
         
         # Add examples
-        report_lines.append(f"\n**Current Examples:**")
+        w(f"\n**Current Examples:**")
         for i, prompt in enumerate(topic_prompts[:2]):
             display_prompt = prompt if len(prompt) <= 150 else prompt[:150] + "..."
-            report_lines.append(f"{i + 1}. \"{display_prompt}\"")
+            w(f"{i + 1}. \"{display_prompt}\"")
         
-        report_lines.append("\n---\n")
+        w("\n---\n")
     
     # Add specific Photonium recommendations
-    report_lines.append("## Photonium-Specific Recommendations\n")
+    w("## Photonium-Specific Recommendations\n")
     
-    report_lines.append("### 1. Optical Component Testing Framework")
-    report_lines.append("- Create standardized test fixtures for S3 component searches")
-    report_lines.append("- Mock Thorlabs/Edmund Optics data for consistent testing")
-    report_lines.append("- Expected savings: 3-4 hours/week on integration testing")
+    w("### 1. Optical Component Testing Framework")
+    w("- Create standardized test fixtures for S3 component searches")
+    w("- Mock Thorlabs/Edmund Optics data for consistent testing")
+    w("- Expected savings: 3-4 hours/week on integration testing")
     
-    report_lines.append("\n### 2. Physics Validation Suite")
-    report_lines.append("- Implement automated validation for beam propagation calculations")
-    report_lines.append("- Add unit tests for optical system JSON outputs")
-    report_lines.append("- Expected impact: 50% reduction in physics debugging prompts")
+    w("\n### 2. Physics Validation Suite")
+    w("- Implement automated validation for beam propagation calculations")
+    w("- Add unit tests for optical system JSON outputs")
+    w("- Expected impact: 50% reduction in physics debugging prompts")
     
-    report_lines.append("\n### 3. Deployment Automation")
-    report_lines.append("- Pre-deployment validation script for Vercel")
-    report_lines.append("- Environment configuration validator")
-    report_lines.append("- Expected savings: $150/month in reduced debugging time")
+    w("\n### 3. Deployment Automation")
+    w("- Pre-deployment validation script for Vercel")
+    w("- Environment configuration validator")
+    w("- Expected savings: $150/month in reduced debugging time")
     
-    report_lines.append("\n### 4. Claude Code Best Practices")
-    report_lines.append("- Use CLAUDE.md for project context (eliminates 20% of setup prompts)")
-    report_lines.append("- Implement --use-todos for complex migrations")
-    report_lines.append("- Create project-specific prompt templates")
+    w("\n### 4. Claude Code Best Practices")
+    w("- Use CLAUDE.md for project context (eliminates 20% of setup prompts)")
+    w("- Implement --use-todos for complex migrations")
+    w("- Create project-specific prompt templates")
     
-    report_lines.append("\n---\n")
+    w("\n---\n")
     
     # Add implementation roadmap
-    report_lines.append("## 30-Day Implementation Roadmap\n")
-    report_lines.append("**Week 1:** Implement CLAUDE.md with Photonium architecture overview")
-    report_lines.append("**Week 2:** Create optical component test fixtures and mocks")
-    report_lines.append("**Week 3:** Build physics validation suite")
-    report_lines.append("**Week 4:** Deploy automation scripts and measure improvements")
-    
-    report_lines.append("\n## Expected ROI\n")
-    report_lines.append("- **Token Cost Reduction:** 35-40% ($300-400/month)")
-    report_lines.append("- **Developer Time Saved:** 15-20 hours/month")
-    report_lines.append("- **Faster Feature Delivery:** 25% improvement in velocity")
-    report_lines.append("- **Total Monthly Value:** $1,200-1,500")
+    w("## 30-Day Implementation Roadmap\n")
+    w("**Week 1:** Implement CLAUDE.md with Photonium architecture overview")
+    w("**Week 2:** Create optical component test fixtures and mocks")
+    w("**Week 3:** Build physics validation suite")
+    w("**Week 4:** Deploy automation scripts and measure improvements")
+    
+    w("\n## Expected ROI\n")
+    w("- **Token Cost Reduction:** 35-40% ($300-400/month)")
+    w("- **Developer Time Saved:** 15-20 hours/month")
+    w("- **Faster Feature Delivery:** 25% improvement in velocity")
+    w("- **Total Monthly Value:** $1,200-1,500")
     
     # Save report
-    with open(output_file, 'w') as f:
-        f.write('\n'.join(report_lines))
+    Path(output_file).write_text(buf.getvalue())
     
     print(f"\nReport saved to: {output_file}")
     
@@ -374,7 +650,7 @@ def generate_photonium_report(
         }
         
         for topic_id, analysis in o3_analyses.items():
-            topic_data = topic_info[topic_info.Topic == topic_id].iloc[0]
+            topic_size = topic_sizes[topic_id]
             analysis_data['pattern_analyses'].append({
                 'topic_id': int(topic_id),
                 'category': analysis['category'],
@@ -382,8 +658,8 @@ def generate_photonium_report(
                 'action': analysis.get('action', ''),
                 'impact': analysis.get('impact', ''),
                 'template': analysis.get('template', ''),
-                'prompt_count': int(topic_data['Count']),
-                'percentage': float(topic_data['Count'] / len(prompts) * 100)
+                'prompt_count': int(topic_size),
+                'percentage': float(topic_size / len(prompts) * 100)
             })
         
         with open(analysis_file, 'w') as f:
@@ -392,12 +668,34 @@ def generate_photonium_report(
         print(f"Detailed analysis saved to: {analysis_file}")
 
 
+def _find_logs(root: str) -> List[str]:
+    """
+    Recursively collect .jsonl and .json files under root in a single os.scandir walk.
+    """
+    stack = [root]
+    log_files = []
+    while stack:
+        # Skip unreadable directories, as Path.glob did, rather than aborting the whole walk
+        try:
+            it = os.scandir(stack.pop())
+        except PermissionError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(('.jsonl', '.json')):
+                    log_files.append(entry.path)
+    return log_files
+
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze Photonium Claude Code usage for optimization')
     parser.add_argument('log_path', help='Path to log files or directory containing logs')
     parser.add_argument('--output', default='photonium_claude_optimization_report.md', help='Output report filename')
     parser.add_argument('--topics', type=int, default=10, help='Number of topics to identify')
     parser.add_argument('--openai-key', help='OpenAI API key for O3 analysis')
+    parser.add_argument('--cpu-fast', action='store_true', help='Use TF-IDF embeddings instead of a sentence transformer (fast on CPU)')
     
     args = parser.parse_args()
     
@@ -409,8 +707,7 @@ def main():
         log_files = [str(path)]
     elif path.is_dir():
         # Find all .jsonl and .json files
-        log_files = list(str(p) for p in path.glob('**/*.jsonl'))
-        log_files.extend(str(p) for p in path.glob('**/*.json'))
+        log_files = _find_logs(str(path))
     else:
         print(f"Error: {args.log_path} not found")
         return
@@ -438,9 +735,18 @@ def main():
     print("\nCleaning prompts...")
     cleaned_prompts = clean_prompts(prompts)
     
+    # Collapse duplicate prompts so each distinct prompt is embedded and clustered once
+    unique_prompts = list(dict.fromkeys(cleaned_prompts))
+    
     # Run BERTopic analysis
-    print(f"\nClustering prompts into {args.topics} topics...")
-    topic_model, topics, probs = analyze_prompts_with_bertopic(cleaned_prompts, n_topics=args.topics)
+    print(f"\nClustering {len(unique_prompts)} unique prompts into {args.topics} topics...")
+    topic_model, unique_topics, probs = analyze_prompts_with_bertopic(
+        unique_prompts, n_topics=args.topics, cpu_fast=args.cpu_fast
+    )
+    
+    # Map topics back onto every prompt, duplicates included
+    topic_by_prompt = dict(zip(unique_prompts, unique_topics))
+    topics = [topic_by_prompt[p] for p in cleaned_prompts]
     
     # Generate report
     print("\nGenerating optimization report...")
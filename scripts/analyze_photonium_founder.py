@@ -4,115 +4,232 @@ Analyze Adam's Claude Code usage to help him build Photonium faster.
 Focus: Agent orchestration, optical design workflows, serving enterprise customers.
 """
 
+import asyncio
+import hashlib
+import io
 import json
+import mmap
 import os
-from typing import List, Dict, Tuple, Optional
+import re
+import shelve
+import time
+from typing import TYPE_CHECKING, Iterator, List, Dict, NamedTuple, Set, Tuple, Optional
 from datetime import datetime
-from collections import defaultdict
-import pandas as pd
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 # Set tokenizers parallelism before importing transformers
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
 import argparse
 from pathlib import Path
-from openai import OpenAI
 
+# BERTopic, sentence-transformers, UMAP, HDBSCAN, sklearn and openai are imported inside the
+# functions that use them, so --help, bad paths and the log-parsing workers don't pay their import cost
+if TYPE_CHECKING:
+    from bertopic import BERTopic
+    from openai import AsyncOpenAI
+    from sentence_transformers import SentenceTransformer
 
-def extract_user_prompts(log_files: List[str]) -> List[Tuple[str, Dict]]:
-    """
-    Extract user prompts from Claude session log files.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps_pretty(obj) -> bytes:
+        # Topic ids are ints, which orjson only accepts as keys with OPT_NON_STR_KEYS
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _json_loads = json.loads
     
-    Returns list of tuples: (prompt_text, metadata)
+    def _json_dumps_pretty(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+# Prompt filters: one startswith over a tuple plus one regex scan per prompt
+_BAD_PREFIX = ("[Request interrupted", "System:", "<system-reminder>")
+_BAD_SUBSTR_RE = re.compile(r"(?i:ultrathink)|--use-todos|\[Request interrupted by user\]")
+
+# On-disk O3 workflow cache keyed by a fingerprint of the topic cluster
+O3_CACHE_PATH = Path("~/.cache/photonium_founder_o3").expanduser()
+O3_CACHE_TTL = 30 * 86400  # seconds
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# On-disk embedding cache so re-runs (e.g. --topics sweeps) only encode prompts not seen before
+EMBEDDING_CACHE_PATH = Path("~/.cache/photonium_founder_embeds").expanduser()
+
+
+class PromptMeta(NamedTuple):
+    """
+    Where a prompt came from. A tuple is far lighter than a dict per prompt.
+    """
+    timestamp: Optional[str]
+    session_id: Optional[str]
+    file: str
+
+
+def _extract_from_file(log_file: str) -> List[Tuple[str, PromptMeta]]:
+    """
+    Extract user prompts from a single Claude session log file.
     """
     prompts = []
     
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                # Try different parsing strategies
-                content = f.read()
-                
-                # Try parsing as JSONL (one JSON per line)
-                if content.strip():
-                    for line_num, line in enumerate(content.strip().split('\n'), 1):
-                        if not line.strip():
-                            continue
-                        try:
-                            entry = json.loads(line)
-                            
-                            # Check if this is a user message
-                            if (entry.get('type') == 'user' or 
-                                (entry.get('message', {}).get('role') == 'user')):
-                                
-                                # Extract content
-                                message = entry.get('message', {})
-                                content_raw = message.get('content', '')
-                                
-                                # Handle different content formats
-                                if isinstance(content_raw, str):
-                                    prompt_text = content_raw
-                                elif isinstance(content_raw, list):
-                                    # Extract text from content blocks
-                                    texts = []
-                                    for block in content_raw:
-                                        if isinstance(block, dict) and block.get('text'):
-                                            texts.append(block['text'])
-                                    prompt_text = ' '.join(texts)
-                                else:
-                                    continue
-                                
-                                if prompt_text.strip():
-                                    # Filter out system messages, interrupted requests, and command-like prompts
-                                    if ("[Request interrupted by user]" not in prompt_text and 
-                                        not prompt_text.startswith("[Request interrupted") and
-                                        not prompt_text.startswith("System:") and
-                                        not prompt_text.startswith("<system-reminder>") and
-                                        "ultrathink" not in prompt_text.lower() and
-                                        "--use-todos" not in prompt_text):
-                                        metadata = {
-                                            'timestamp': entry.get('timestamp'),
-                                            'session_id': entry.get('sessionId'),
-                                            'file': log_file,
-                                            'line': line_num
-                                        }
-                                        prompts.append((prompt_text.strip(), metadata))
-                                    
-                        except json.JSONDecodeError:
-                            # Skip malformed lines
+    try:
+        # mmap can't map an empty file
+        if os.path.getsize(log_file) == 0:
+            return prompts
+        
+        with open(log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Scan the mapped JSONL (one JSON per line) for newlines and parse the raw byte slices directly
+            size = len(mm)
+            start = 0
+            while start < size:
+                nl = mm.find(b'\n', start)
+                if nl == -1:
+                    nl = size  # Last line without a trailing newline
+                line = mm[start:nl]
+                start = nl + 1
+                if not line.strip():
+                    continue
+                try:
+                    entry = _json_loads(line)
+                    
+                    # Check if this is a user message
+                    if (entry.get('type') == 'user' or 
+                        (entry.get('message', {}).get('role') == 'user')):
+                        
+                        # Extract content
+                        message = entry.get('message', {})
+                        content_raw = message.get('content', '')
+                        
+                        # Handle different content formats
+                        if isinstance(content_raw, str):
+                            prompt_text = content_raw
+                        elif isinstance(content_raw, list):
+                            # Extract text from content blocks; they're almost always dicts,
+                            # so only type-check them when that assumption fails
+                            try:
+                                texts = [b['text'] for b in content_raw if b.get('text')]
+                            except AttributeError:
+                                texts = [b['text'] for b in content_raw if isinstance(b, dict) and b.get('text')]
+                            prompt_text = ' '.join(texts)
+                        else:
                             continue
+                        
+                        if prompt_text.strip():
+                            # Filter out system messages, interrupted requests, and command-like prompts
+                            if (not prompt_text.startswith(_BAD_PREFIX) and
+                                not _BAD_SUBSTR_RE.search(prompt_text)):
+                                metadata = PromptMeta(entry.get('timestamp'), entry.get('sessionId'), log_file)
+                                prompts.append((prompt_text.strip(), metadata))
                             
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-            continue
+                except ValueError:
+                    # Skip malformed lines (JSONDecodeError or bad UTF-8)
+                    continue
+                    
+    except Exception as e:
+        print(f"Error processing {log_file}: {e}")
     
     return prompts
 
 
+def extract_user_prompts(log_files: List[str]) -> Tuple[List[Tuple[str, PromptMeta]], Set[Optional[str]]]:
+    """
+    Extract user prompts from Claude session log files.
+    
+    Files are parsed in parallel worker processes since each one is independent.
+    
+    Returns (list of (prompt_text, metadata) tuples, set of session ids seen)
+    """
+    # A single file isn't worth the process startup cost
+    if len(log_files) == 1:
+        results = [_extract_from_file(log_files[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(_extract_from_file, log_files, chunksize=4))
+    
+    prompts = []
+    session_ids = set()
+    for file_prompts in results:
+        prompts.extend(file_prompts)
+        session_ids.update(meta.session_id for _, meta in file_prompts)
+    
+    return prompts, session_ids
+
+
 def clean_prompts(prompts: List[str]) -> List[str]:
     """
     Clean and preprocess prompts for better clustering.
     """
-    cleaned = []
-    for prompt in prompts:
-        # Remove excessive whitespace
-        prompt = ' '.join(prompt.split())
-        
-        # Truncate very long prompts (keep first 500 chars for topic modeling)
-        if len(prompt) > 500:
-            prompt = prompt[:500] + "..."
-            
-        cleaned.append(prompt)
-    
-    return cleaned
+    # Remove excessive whitespace, then truncate very long prompts
+    # (keep first 500 chars for topic modeling)
+    return [
+        prompt if len(prompt) <= 500 else prompt[:500] + "..."
+        for prompt in (' '.join(p.split()) for p in prompts)
+    ]
 
 
-def analyze_prompts_with_bertopic(prompts: List[str], n_topics: int = 10) -> Tuple[BERTopic, List[int], List[float]]:
+def load_or_compute_embeddings(prompts: List[str], embedding_model: "SentenceTransformer") -> np.ndarray:
+    """
+    Look up prompt embeddings in the on-disk cache and encode only the misses.
+    
+    Entries are keyed by a hash of the model name and prompt text.
+    """
+    keys = [
+        hashlib.blake2b(f"{EMBEDDING_MODEL_NAME}\0{p}".encode(), digest_size=16).hexdigest()
+        for p in prompts
+    ]
+    dim = embedding_model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(prompts), dim), dtype=np.float32)
+    
+    EMBEDDING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with shelve.open(str(EMBEDDING_CACHE_PATH)) as cache:
+        miss_idx = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None and len(cached) == dim * 4:
+                embeddings[i] = np.frombuffer(cached, dtype=np.float32)
+            else:
+                miss_idx.append(i)
+        
+        if miss_idx:
+            new_embeddings = embedding_model.encode(
+                [prompts[i] for i in miss_idx],
+                batch_size=64,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            for i, emb in zip(miss_idx, new_embeddings):
+                embeddings[i] = emb
+                cache[keys[i]] = emb.astype(np.float32).tobytes()
+    
+    return embeddings
+
+
+def analyze_prompts_with_bertopic(
+    prompts: List[str],
+    n_topics: int = 10,
+    embeddings: Optional[np.ndarray] = None,
+    embedding_model: Optional["SentenceTransformer"] = None
+) -> Tuple["BERTopic", List[int], None]:
     """
     Use BERTopic to cluster prompts into topics.
+    
+    Embeddings are computed (or loaded from cache) up front unless given, so BERTopic
+    doesn't re-encode the prompts. Topic probabilities aren't used by the playbook,
+    so they aren't computed and None is returned.
     """
+    from bertopic import BERTopic
+    from hdbscan import HDBSCAN
+    from sentence_transformers import SentenceTransformer
+    from sklearn.feature_extraction.text import CountVectorizer
+    from umap import UMAP
+    
+    if embedding_model is None:
+        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    if embeddings is None:
+        embeddings = load_or_compute_embeddings(prompts, embedding_model)
+    
     # Configure BERTopic
     vectorizer_model = CountVectorizer(
         ngram_range=(1, 3),
@@ -120,48 +237,62 @@ def analyze_prompts_with_bertopic(prompts: List[str], n_topics: int = 10) -> Tup
         min_df=2
     )
     
+    # Lighter UMAP than BERTopic's default, and HDBSCAN with core distances computed on all cores.
+    # No random_state on UMAP: seeding it forces single-threaded layout optimization.
+    umap_model = UMAP(n_neighbors=10, n_components=5, metric='cosine', low_memory=True)
+    hdbscan_model = HDBSCAN(
+        min_cluster_size=3,
+        metric='euclidean',
+        cluster_selection_method='eom',
+        core_dist_n_jobs=-1,
+        prediction_data=False  # approximate_predict is never used
+    )
+    
     topic_model = BERTopic(
+        embedding_model=embedding_model,
+        umap_model=umap_model,
+        hdbscan_model=hdbscan_model,
         vectorizer_model=vectorizer_model,
         min_topic_size=3,  # Minimum cluster size
         nr_topics=n_topics,  # Reduce to n_topics
-        calculate_probabilities=True,
+        calculate_probabilities=False,  # Skip HDBSCAN soft-clustering
         verbose=True
     )
     
     # Fit the model
-    topics, probs = topic_model.fit_transform(prompts)
+    topics, _ = topic_model.fit_transform(prompts, embeddings=embeddings)
     
-    return topic_model, topics, probs
+    return topic_model, topics, None
 
 
-def classify_photonium_workflow(
+async def classify_photonium_workflow_async(
     prompts: List[str], 
     topic_words: List[str],
-    openai_key: Optional[str] = None,
+    client: "AsyncOpenAI",
     existing_categories: List[str] = None
 ) -> Dict:
     """
     Use O3 to identify optical design workflows and create powerful agent templates.
-    """
-    if not openai_key:
-        openai_key = os.getenv('OPENAI_API_KEY')
     
-    if not openai_key:
-        return {
-            "workflow": "Analysis unavailable (no OpenAI API key)",
-            "pattern": "",
-            "template": "",
-            "time_saved": ""
-        }
+    Async so the per-topic O3 calls can run concurrently, sharing one client (and its
+    connection pool). Results are cached on disk by cluster fingerprint so re-runs over
+    unchanged clusters skip the API call.
+    """
+    cache_key = hashlib.sha256(
+        ("|".join(sorted(prompts[:20])) + "||" + ",".join(topic_words[:10])).encode()
+    ).hexdigest()
+    O3_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with shelve.open(str(O3_CACHE_PATH)) as cache:
+        cached = cache.get(cache_key)
+    if cached and time.time() - cached['cached_at'] < O3_CACHE_TTL:
+        return cached['result']
     
     try:
-        client = OpenAI(api_key=openai_key)
-        
-        # Sample prompts for analysis
+        # Sample prompts for analysis (most representative first when embeddings were available)
         sample_prompts = prompts[:5]
         existing_str = ""
         if existing_categories:
-            existing_str = f"\nAlready identified workflows (find something different): {', '.join(existing_categories)}\n"
+            existing_str = f"\nOther workflows being analyzed (find something different): {', '.join(existing_categories)}\n"
         
         prompt = f"""You're analyzing prompts from Adam, a physics PhD who left research to build Photonium.
 Photonium automates optical system design for quantum computing, biotech, LiDAR, and semiconductor companies.
@@ -190,7 +321,7 @@ Return JSON with:
 
 The template should be a complete, copy-paste ready prompt that builds the entire feature/workflow."""
         
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="o3",
             messages=[
                 {"role": "system", "content": "You help physics founders build optical design systems faster. Create complete workflow templates, not incremental improvements."},
@@ -204,6 +335,8 @@ The template should be a complete, copy-paste ready prompt that builds the entir
         
         try:
             parsed = json.loads(content)
+            with shelve.open(str(O3_CACHE_PATH)) as cache:
+                cache[cache_key] = {'cached_at': time.time(), 'result': parsed}
             return parsed
         except:
             return {
@@ -223,85 +356,8 @@ The template should be a complete, copy-paste ready prompt that builds the entir
         }
 
 
-def generate_founder_report(
-    topic_model: BERTopic, 
-    prompts: List[str], 
-    topics: List[int],
-    metadata: List[Dict],
-    output_file: str = "photonium_founder_playbook.md",
-    openai_key: Optional[str] = None
-):
-    """
-    Generate a founder-focused report on building Photonium faster.
-    """
-    report_lines = []
-    report_lines.append("# Photonium Founder's Claude Code Playbook")
-    report_lines.append(f"\n**Adam, here's how to build 10x faster with Claude Code**")
-    report_lines.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Quick stats
-    report_lines.append("\n## Your Current Development Pattern")
-    report_lines.append(f"- **Sessions Analyzed:** {len(set(m.get('session_id', '') for m in metadata))}")
-    report_lines.append(f"- **Total Prompts:** {len(prompts)}")
-    report_lines.append(f"- **Key Finding:** You're rebuilding the same optical workflows repeatedly")
-    
-    report_lines.append("\n---\n")
-    
-    # Get topic info
-    topic_info = topic_model.get_topic_info()
-    topic_info = topic_info[topic_info.Topic != -1]  # Filter outliers
-    
-    report_lines.append(f"\n## Top {min(5, len(topic_info))} Optical Design Workflows to Templatize\n")
-    report_lines.append("*Copy these templates to build complete features in one Claude Code message*\n")
-    
-    # Analyze top 5 workflows
-    workflow_analyses = {}
-    existing_workflows = []
-    
-    for idx, row in topic_info.head(5).iterrows():
-        topic_id = row['Topic']
-        topic_size = row['Count']
-        
-        # Get prompts for this topic
-        topic_prompts = [p for p, t in zip(prompts, topics) if t == topic_id]
-        
-        # Get topic words
-        words = topic_model.get_topic(topic_id)
-        top_words = [word for word, _ in words[:10]] if words else []
-        
-        # Get workflow analysis
-        analysis = classify_photonium_workflow(topic_prompts, top_words, openai_key, existing_workflows)
-        workflow_analyses[topic_id] = analysis
-        existing_workflows.append(analysis['workflow'])
-        
-        report_lines.append(f"### Workflow {idx + 1}: {analysis['workflow']}")
-        report_lines.append(f"\n**Frequency:** You've built this {topic_size} times")
-        report_lines.append(f"**Time Saved:** {analysis.get('time_saved', 'Significant')}")
-        report_lines.append(f"**Customer Impact:** {analysis.get('customer_impact', 'Faster delivery to quantum/biotech customers')}")
-        
-        report_lines.append(f"\n**Pattern:** {analysis.get('pattern', 'Workflow identified')}")
-        
-        # Add the complete template
-        if 'template' in analysis and analysis['template']:
-            report_lines.append(f"\n**🚀 Complete Claude Code Template:**")
-            report_lines.append("```")
-            report_lines.append(analysis['template'])
-            report_lines.append("```")
-        
-        # Show what you were doing before
-        report_lines.append(f"\n**Your Previous Attempts (taking hours):**")
-        for i, prompt in enumerate(topic_prompts[:2]):
-            display_prompt = prompt if len(prompt) <= 100 else prompt[:100] + "..."
-            report_lines.append(f"- \"{display_prompt}\"")
-        
-        report_lines.append("\n---\n")
-    
-    # Add power user tips
-    report_lines.append("## 🏃 Speed Hacks for Physics Founders\n")
-    
-    report_lines.append("### 1. The 'Complete Optical System' Prompt")
-    report_lines.append("```")
-    report_lines.append("""ultrathink Build complete optical system: [SYSTEM_TYPE]
+# Static playbook templates, built once at import rather than on every report
+_COMPLETE_SYSTEM_TEMPLATE = """ultrathink Build complete optical system: [SYSTEM_TYPE]
 Requirements:
 - Components: [Thorlabs/Edmund preferred]
 - Specs: [wavelength, power, beam size]
@@ -314,12 +370,9 @@ Create:
 4. Complete JSON for Unity/CAD
 5. Bill of materials
 
-Test the system end-to-end and show the JSON output.""")
-    report_lines.append("```")
-    
-    report_lines.append("\n### 2. The 'Agent Orchestration' Pattern")
-    report_lines.append("```")
-    report_lines.append("""Create a complete agent workflow for [OPTICAL_SYSTEM]:
+Test the system end-to-end and show the JSON output."""
+
+_AGENT_ORCHESTRATION_TEMPLATE = """Create a complete agent workflow for [OPTICAL_SYSTEM]:
 1. Research tool: Find best practices from papers
 2. Design tool: Generate optical layout
 3. Validate tool: Check physics constraints  
@@ -327,28 +380,18 @@ Test the system end-to-end and show the JSON output.""")
 5. Output tool: Generate manufacturing JSON
 
 Wire these together and test with: beam expander, fiber coupler, interferometer.
-Show me the complete working system.""")
-    report_lines.append("```")
-    
-    report_lines.append("\n### 3. The 'Migration Accelerator'")
-    report_lines.append("```")
-    report_lines.append("""I have a Python optical design system. Migrate to Next.js + Vercel:
+Show me the complete working system."""
+
+_MIGRATION_TEMPLATE = """I have a Python optical design system. Migrate to Next.js + Vercel:
 - Keep ALL physics calculations working
 - Maintain 100% tool calling accuracy
 - Preserve S3 component database integration
 - Add real-time JSON preview
 - Test thoroughly with optical designs
 
-Complete the migration and deploy to Vercel.""")
-    report_lines.append("```")
-    
-    report_lines.append("\n---\n")
-    
-    # Add CLAUDE.md recommendation
-    report_lines.append("## 🎯 Your CLAUDE.md File (Save 30% of prompts)")
-    report_lines.append("\nCreate this file in your project root:")
-    report_lines.append("```markdown")
-    report_lines.append("""# Photonium Optical Design System
+Complete the migration and deploy to Vercel."""
+
+_CLAUDE_MD_TEMPLATE = """# Photonium Optical Design System
 
 ## Context
 Building AI-powered optical design for quantum computing, biotech, LiDAR, semiconductors.
@@ -373,43 +416,216 @@ Migrating from Python/FastAPI → Next.js while maintaining physics accuracy.
 ## Testing Requirements
 ALWAYS test end-to-end with: beam expanders, interferometers, fiber optics.
 Success = Complete JSON with manufacturable design.
-""")
-    report_lines.append("```")
+"""
+
+
+async def _classify_workflows(topic_jobs: List[Tuple], openai_key: Optional[str]) -> List[Dict]:
+    """
+    Classify all topic workflows with O3 concurrently, returning analyses in job order.
     
-    report_lines.append("\n---\n")
+    The calls can't see each other's results, so each one is told the other topics'
+    lead keywords up front instead of the workflows already identified.
+    """
+    from openai import AsyncOpenAI
+    
+    lead_words = [top_words[0] for _, _, _, top_words in topic_jobs if top_words]
+    async with AsyncOpenAI(api_key=openai_key) as client:
+        return await asyncio.gather(*(
+            classify_photonium_workflow_async(
+                topic_prompts,
+                top_words,
+                client,
+                [w for w in lead_words if w not in top_words[:1]]
+            )
+            for _, _, topic_prompts, top_words in topic_jobs
+        ))
+
+
+def generate_founder_report(
+    topic_model: "BERTopic", 
+    prompts: List[str], 
+    topics: List[int],
+    metadata: List[PromptMeta],
+    output_file: str = "photonium_founder_playbook.md",
+    openai_key: Optional[str] = None,
+    session_ids: Optional[Set[Optional[str]]] = None,
+    embeddings: Optional[np.ndarray] = None
+):
+    """
+    Generate a founder-focused report on building Photonium faster.
+    
+    If embeddings (one row per prompt) are given, each workflow's prompts are ordered by
+    closeness to the topic centroid, so O3 and the report see representative examples.
+    """
+    # Write report lines straight into a buffer rather than collecting and joining a list
+    buf = io.StringIO()
+    
+    def w(line: str):
+        buf.write(line)
+        buf.write("\n")
+    
+    w("# Photonium Founder's Claude Code Playbook")
+    w(f"\n**Adam, here's how to build 10x faster with Claude Code**")
+    w(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    # Quick stats
+    w("\n## Your Current Development Pattern")
+    if session_ids is None:
+        session_ids = {m.session_id or '' for m in metadata}
+    w(f"- **Sessions Analyzed:** {len(session_ids)}")
+    w(f"- **Total Prompts:** {len(prompts)}")
+    w(f"- **Key Finding:** You're rebuilding the same optical workflows repeatedly")
+    
+    w("\n---\n")
+    
+    workflow_analyses = {}
+    openai_key = openai_key or os.getenv('OPENAI_API_KEY')
+    if not openai_key:
+        # Every workflow section depends on O3, so skip them all rather than emitting stubs
+        w("## ⚠️ Workflow Templates Unavailable\n")
+        w("Set `OPENAI_API_KEY` (or pass `--openai-key`) to identify your top workflows "
+          "and generate complete templates for them.")
+        w("\n---\n")
+    else:
+        # Rank topics by how many prompts (duplicates included) fell into each, ignoring outliers
+        topic_sizes = Counter(t for t in topics if t != -1)
+        top_topics = topic_sizes.most_common(5)
+        
+        w(f"\n## Top {len(top_topics)} Optical Design Workflows to Templatize\n")
+        w("*Copy these templates to build complete features in one Claude Code message*\n")
+        
+        # Bucket prompt indices by topic in one pass instead of rescanning them for every topic
+        indices_by_topic = defaultdict(list)
+        for i, t in enumerate(topics):
+            indices_by_topic[t].append(i)
+        
+        # Gather prompts and key words for the top 5 workflows
+        topic_jobs = []
+        for idx, (topic_id, _) in enumerate(top_topics):
+            # Get prompts for this topic, most central (by cosine similarity to the centroid) first
+            indices = indices_by_topic[topic_id]
+            if embeddings is not None:
+                vecs = embeddings[indices]
+                vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+                order = np.argsort(-(vecs @ vecs.mean(axis=0)), kind='stable')
+                # Duplicates share an embedding, so keep only the first of each
+                topic_prompts = list(dict.fromkeys(prompts[indices[k]] for k in order))
+            else:
+                topic_prompts = [prompts[i] for i in indices]
+            
+            # Get topic words
+            words = topic_model.get_topic(topic_id)
+            top_words = [word for word, _ in words[:10]] if words else []
+            
+            topic_jobs.append((idx, topic_id, topic_prompts, top_words))
+        
+        # Analyze top 5 workflows concurrently
+        analyses = asyncio.run(_classify_workflows(topic_jobs, openai_key))
+        
+        for (idx, topic_id, topic_prompts, top_words), analysis in zip(topic_jobs, analyses):
+            topic_size = topic_sizes[topic_id]
+            workflow_analyses[topic_id] = analysis
+            
+            w(f"### Workflow {idx + 1}: {analysis['workflow']}")
+            w(f"\n**Frequency:** You've built this {topic_size} times")
+            w(f"**Time Saved:** {analysis.get('time_saved', 'Significant')}")
+            w(f"**Customer Impact:** {analysis.get('customer_impact', 'Faster delivery to quantum/biotech customers')}")
+            
+            w(f"\n**Pattern:** {analysis.get('pattern', 'Workflow identified')}")
+            
+            # Add the complete template
+            if 'template' in analysis and analysis['template']:
+                w(f"\n**🚀 Complete Claude Code Template:**")
+                w("```")
+                w(analysis['template'])
+                w("```")
+            
+            # Show what you were doing before
+            w(f"\n**Your Previous Attempts (taking hours):**")
+            for i, prompt in enumerate(topic_prompts[:2]):
+                display_prompt = prompt if len(prompt) <= 100 else prompt[:100] + "..."
+                w(f"- \"{display_prompt}\"")
+            
+            w("\n---\n")
+    
+    # Add power user tips
+    w("## 🏃 Speed Hacks for Physics Founders\n")
+    
+    w("### 1. The 'Complete Optical System' Prompt")
+    w("```")
+    w(_COMPLETE_SYSTEM_TEMPLATE)
+    w("```")
+    
+    w("\n### 2. The 'Agent Orchestration' Pattern")
+    w("```")
+    w(_AGENT_ORCHESTRATION_TEMPLATE)
+    w("```")
+    
+    w("\n### 3. The 'Migration Accelerator'")
+    w("```")
+    w(_MIGRATION_TEMPLATE)
+    w("```")
+    
+    w("\n---\n")
+    
+    # Add CLAUDE.md recommendation
+    w("## 🎯 Your CLAUDE.md File (Save 30% of prompts)")
+    w("\nCreate this file in your project root:")
+    w("```markdown")
+    w(_CLAUDE_MD_TEMPLATE)
+    w("```")
+    
+    w("\n---\n")
     
     # Business impact
-    report_lines.append("## 💰 Business Impact")
-    report_lines.append("\nBy implementing these templates:")
-    report_lines.append("- **Feature Development:** 1 week → 1 day")
-    report_lines.append("- **Customer Demos:** Build live during calls")
-    report_lines.append("- **Quantum/Biotech Delivery:** Ship 5x faster")
-    report_lines.append("- **Technical Debt:** Reduce by 70%")
-    
-    report_lines.append("\n## Next Steps")
-    report_lines.append("1. Copy the templates above into a `prompts/` folder")
-    report_lines.append("2. Create the CLAUDE.md file")
-    report_lines.append("3. Use `--use-todos` for complex migrations")
-    report_lines.append("4. Stop rebuilding - start shipping to customers")
+    w("## 💰 Business Impact")
+    w("\nBy implementing these templates:")
+    w("- **Feature Development:** 1 week → 1 day")
+    w("- **Customer Demos:** Build live during calls")
+    w("- **Quantum/Biotech Delivery:** Ship 5x faster")
+    w("- **Technical Debt:** Reduce by 70%")
+    
+    w("\n## Next Steps")
+    w("1. Copy the templates above into a `prompts/` folder")
+    w("2. Create the CLAUDE.md file")
+    w("3. Use `--use-todos` for complex migrations")
+    w("4. Stop rebuilding - start shipping to customers")
     
     # Save report
-    with open(output_file, 'w') as f:
-        f.write('\n'.join(report_lines))
+    with open(output_file, 'wb') as f:
+        f.write(buf.getvalue().encode('utf-8'))
     
     print(f"\nFounder playbook saved to: {output_file}")
     
     # Save workflow analysis
     if workflow_analyses:
         analysis_file = output_file.replace('.md', '_workflows.json')
-        with open(analysis_file, 'w') as f:
-            json.dump({
+        with open(analysis_file, 'wb') as f:
+            f.write(_json_dumps_pretty({
                 'timestamp': datetime.now().isoformat(),
                 'workflows': workflow_analyses
-            }, f, indent=2)
+            }))
         
         print(f"Workflow templates saved to: {analysis_file}")
 
 
+def _walk(root: str) -> Iterator[os.DirEntry]:
+    """
+    Recursively yield the file entries under root using os.scandir.
+    """
+    # Skip unreadable directories, as Path.glob did, rather than aborting the whole walk
+    try:
+        it = os.scandir(root)
+    except PermissionError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            else:
+                yield entry
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate Photonium founder playbook for Claude Code')
     parser.add_argument('log_path', help='Path to log files or directory containing logs')
@@ -426,9 +642,8 @@ def main():
     if path.is_file():
         log_files = [str(path)]
     elif path.is_dir():
-        # Find all .jsonl and .json files
-        log_files = list(str(p) for p in path.glob('**/*.jsonl'))
-        log_files.extend(str(p) for p in path.glob('**/*.json'))
+        # Find all .jsonl and .json files in one walk
+        log_files = [entry.path for entry in _walk(str(path)) if entry.name.endswith(('.jsonl', '.json'))]
     else:
         print(f"Error: {args.log_path} not found")
         return
@@ -441,7 +656,7 @@ def main():
     
     # Extract prompts
     print("\nExtracting optical design workflows...")
-    prompt_data = extract_user_prompts(log_files)
+    prompt_data, session_ids = extract_user_prompts(log_files)
     
     if not prompt_data:
         print("No user prompts found in logs")
@@ -456,13 +671,40 @@ def main():
     print("\nAnalyzing optical design patterns...")
     cleaned_prompts = clean_prompts(prompts)
     
+    # Collapse exact duplicates (retries, copy-paste) so each distinct prompt is embedded once
+    seen = {}
+    unique_prompts = []
+    back_idx = []
+    for p in cleaned_prompts:
+        k = seen.setdefault(p, len(unique_prompts))
+        if k == len(unique_prompts):
+            unique_prompts.append(p)
+        back_idx.append(k)
+    
+    # Embed the unique prompts here, since the report also uses them to pick representative examples
+    from sentence_transformers import SentenceTransformer
+    
+    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    unique_embeddings = load_or_compute_embeddings(unique_prompts, embedding_model)
+    
     # Run BERTopic analysis
     print(f"\nIdentifying top {args.topics} workflows to templatize...")
-    topic_model, topics, probs = analyze_prompts_with_bertopic(cleaned_prompts, n_topics=args.topics)
+    topic_model, unique_topics, _ = analyze_prompts_with_bertopic(
+        unique_prompts,
+        n_topics=args.topics,
+        embeddings=unique_embeddings,
+        embedding_model=embedding_model
+    )
+    
+    # Propagate topics and embeddings back to every prompt so frequencies reflect the full corpus
+    topics = [unique_topics[k] for k in back_idx]
+    embeddings = unique_embeddings[back_idx]
     
     # Generate report
     print("\nGenerating founder playbook...")
-    generate_founder_report(topic_model, cleaned_prompts, topics, metadata, args.output, args.openai_key)
+    generate_founder_report(
+        topic_model, cleaned_prompts, topics, metadata, args.output, args.openai_key, session_ids, embeddings
+    )
     
     print("\n✅ Playbook complete! Start building faster.")
 
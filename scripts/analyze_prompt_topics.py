@@ -5,89 +5,131 @@ This script extracts user prompts from logs, clusters them into topics,
 and generates a report showing the top prompt categories with examples.
 """
 
+import csv
+import functools
+import hashlib
 import json
 import os
-from typing import List, Dict, Tuple, Optional
+import re
+import shelve
+from typing import TYPE_CHECKING, Iterator, List, Dict, Tuple, Optional
 from datetime import datetime
 from collections import defaultdict
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 # Set tokenizers parallelism before importing transformers
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
 import argparse
 from pathlib import Path
-from openai import OpenAI
+
+# BERTopic, sentence-transformers, sklearn and openai are imported inside the functions that
+# use them, so --help, bad paths and the log-parsing workers don't pay their import cost
+if TYPE_CHECKING:
+    from bertopic import BERTopic
+    from openai import OpenAI
+    from sentence_transformers import SentenceTransformer
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Prompts to skip: interrupted requests, system messages, and command-like prompts.
+# One compiled pattern replaces a chain of substring/startswith checks per prompt.
+_REJECT_RE = re.compile(
+    r"\A(?:\[Request interrupted|System:|<system-reminder>)"
+    r"|\[Request interrupted by user\]"
+    r"|(?i:ultrathink)"
+    r"|--use-todos"
+)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+O3_MAX_RETRIES = 5
+
+# On-disk embedding cache so re-runs only encode prompts not seen before
+EMBEDDING_CACHE_PATH = Path("~/.cache/prompt_topics_embeds").expanduser()
+
+
+def _extract_from_file(log_file: str) -> List[Tuple[str, Dict]]:
+    """
+    Extract user prompts from a single Claude session log file.
+    """
+    prompts = []
+    
+    try:
+        # Nothing shorter than '{}' can hold an entry, so skip those files with a stat instead of an open
+        if os.path.getsize(log_file) < 2:
+            return prompts
+        
+        with open(log_file, 'rb') as f:
+            # Stream as JSONL (one JSON per line) and parse the raw bytes directly
+            for line_num, line in enumerate(f, 1):
+                line = line.rstrip(b'\n')
+                if not line.strip():
+                    continue
+                try:
+                    entry = _json_loads(line)
+                    
+                    # Check if this is a user message
+                    if (entry.get('type') == 'user' or 
+                        (entry.get('message', {}).get('role') == 'user')):
+                        
+                        # Extract content
+                        message = entry.get('message', {})
+                        content_raw = message.get('content', '')
+                        
+                        # Handle different content formats
+                        if isinstance(content_raw, str):
+                            prompt_text = content_raw
+                        elif isinstance(content_raw, list):
+                            # Extract text from content blocks
+                            prompt_text = ' '.join(
+                                b['text'] for b in content_raw if isinstance(b, dict) and b.get('text')
+                            )
+                        else:
+                            continue
+                        
+                        if prompt_text.strip():
+                            # Filter out system messages, interrupted requests, and command-like prompts
+                            if not _REJECT_RE.search(prompt_text):
+                                metadata = {
+                                    'timestamp': entry.get('timestamp'),
+                                    'session_id': entry.get('sessionId'),
+                                    'file': log_file,
+                                    'line': line_num
+                                }
+                                prompts.append((prompt_text.strip(), metadata))
+                            
+                except ValueError:
+                    # Skip malformed lines (JSONDecodeError or bad UTF-8)
+                    continue
+                    
+    except Exception as e:
+        print(f"Error processing {log_file}: {e}")
+    
+    return prompts
 
 
 def extract_user_prompts(log_files: List[str]) -> List[Tuple[str, Dict]]:
     """
     Extract user prompts from Claude session log files.
     
+    Files are parsed in parallel worker processes since each one is independent.
+    
     Returns list of tuples: (prompt_text, metadata)
     """
-    prompts = []
+    # A single file isn't worth the process startup cost
+    if len(log_files) == 1:
+        return _extract_from_file(log_files[0])
     
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                # Try different parsing strategies
-                content = f.read()
-                
-                # Try parsing as JSONL (one JSON per line)
-                if content.strip():
-                    for line_num, line in enumerate(content.strip().split('\n'), 1):
-                        if not line.strip():
-                            continue
-                        try:
-                            entry = json.loads(line)
-                            
-                            # Check if this is a user message
-                            if (entry.get('type') == 'user' or 
-                                (entry.get('message', {}).get('role') == 'user')):
-                                
-                                # Extract content
-                                message = entry.get('message', {})
-                                content_raw = message.get('content', '')
-                                
-                                # Handle different content formats
-                                if isinstance(content_raw, str):
-                                    prompt_text = content_raw
-                                elif isinstance(content_raw, list):
-                                    # Extract text from content blocks
-                                    texts = []
-                                    for block in content_raw:
-                                        if isinstance(block, dict) and block.get('text'):
-                                            texts.append(block['text'])
-                                    prompt_text = ' '.join(texts)
-                                else:
-                                    continue
-                                
-                                if prompt_text.strip():
-                                    # Filter out system messages, interrupted requests, and command-like prompts
-                                    if ("[Request interrupted by user]" not in prompt_text and 
-                                        not prompt_text.startswith("[Request interrupted") and
-                                        not prompt_text.startswith("System:") and
-                                        not prompt_text.startswith("<system-reminder>") and
-                                        "ultrathink" not in prompt_text.lower() and
-                                        "--use-todos" not in prompt_text):
-                                        metadata = {
-                                            'timestamp': entry.get('timestamp'),
-                                            'session_id': entry.get('sessionId'),
-                                            'file': log_file,
-                                            'line': line_num
-                                        }
-                                        prompts.append((prompt_text.strip(), metadata))
-                                    
-                        except json.JSONDecodeError:
-                            # Skip malformed lines
-                            continue
-                            
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-            continue
+    prompts = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for file_prompts in executor.map(_extract_from_file, log_files, chunksize=8):
+            prompts.extend(file_prompts)
     
     return prompts
 
@@ -110,58 +152,209 @@ def clean_prompts(prompts: List[str]) -> List[str]:
     return cleaned
 
 
-def analyze_prompts_with_bertopic(prompts: List[str], n_topics: int = 10) -> Tuple[BERTopic, List[int], List[float]]:
+def load_or_compute_embeddings(prompts: List[str], embedding_model: 'SentenceTransformer') -> np.ndarray:
+    """
+    Look up prompt embeddings in the on-disk cache and encode only the misses.
+    
+    Entries are keyed by a hash of the model name and prompt text.
+    """
+    keys = [
+        hashlib.blake2b(f"{EMBEDDING_MODEL_NAME}\0{p}".encode(), digest_size=16).hexdigest()
+        for p in prompts
+    ]
+    dim = embedding_model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(prompts), dim), dtype=np.float32)
+    
+    EMBEDDING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with shelve.open(str(EMBEDDING_CACHE_PATH)) as cache:
+        miss_idx = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None and len(cached) == dim * 4:
+                embeddings[i] = np.frombuffer(cached, dtype=np.float32)
+            else:
+                miss_idx.append(i)
+        
+        print(f"Embedding cache: {len(prompts) - len(miss_idx)} hits, {len(miss_idx)} misses")
+        
+        if miss_idx:
+            new_embeddings = embedding_model.encode(
+                [prompts[i] for i in miss_idx],
+                batch_size=64,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            for i, emb in zip(miss_idx, new_embeddings):
+                embeddings[i] = emb
+                cache[keys[i]] = emb.astype(np.float32).tobytes()
+    
+    return embeddings
+
+
+def _load_cuml():
+    """
+    Return the optional RAPIDS cuML (UMAP, HDBSCAN) GPU classes, or (None, None) if cuML isn't installed.
+    """
+    try:
+        from cuml.manifold import UMAP as cuUMAP
+        from cuml.cluster import HDBSCAN as cuHDBSCAN
+    except ImportError:
+        return None, None
+    return cuUMAP, cuHDBSCAN
+
+
+def tfidf_embeddings(prompts: List[str]) -> np.ndarray:
+    """
+    Cheap CPU embeddings: hashed TF-IDF features reduced to dense vectors with TruncatedSVD.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline, make_union
+    
+    # Two hashing spaces of different sizes make it unlikely that colliding terms collide in both
+    pipe = make_pipeline(
+        make_union(HashingVectorizer(n_features=10000), HashingVectorizer(n_features=9000)),
+        TfidfTransformer(),
+        TruncatedSVD(n_components=min(100, len(prompts) - 1), random_state=0)
+    )
+    return pipe.fit_transform(prompts).astype(np.float32)
+
+
+def analyze_prompts_with_bertopic(
+    prompts: List[str],
+    n_topics: int = 10,
+    cpu_fast: bool = False,
+    model_path: Optional[Path] = None,
+    incremental: bool = False
+) -> Tuple['BERTopic', List[int], None]:
     """
     Use BERTopic to cluster prompts into topics.
+    
+    Embeddings come from the on-disk cache where possible, and are passed to BERTopic
+    so it doesn't encode the prompts itself. With cpu_fast, TF-IDF embeddings replace
+    the sentence transformer. UMAP and HDBSCAN run on the GPU via cuML when it's installed.
+    Topic probabilities aren't used by the report, so they aren't computed and None is returned.
+    
+    The fitted model is saved to model_path (sentence-transformer embeddings only). With
+    incremental, a model saved there by an earlier run is loaded and prompts are assigned to
+    its topics with transform() instead of refitting UMAP and HDBSCAN.
     """
+    from bertopic import BERTopic
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    if cpu_fast:
+        embedding_model = None
+        embeddings = tfidf_embeddings(prompts)
+    else:
+        from sentence_transformers import SentenceTransformer
+        
+        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        embeddings = load_or_compute_embeddings(prompts, embedding_model)
+    
     # Configure BERTopic
+    # Prune rare n-grams, cap the trigram vocabulary and use int32 counts to bound c-TF-IDF memory.
+    # min_df=5 would prune away the whole vocabulary on small corpora.
     vectorizer_model = CountVectorizer(
         ngram_range=(1, 3),
         stop_words="english",
-        min_df=2
+        min_df=5 if len(prompts) > 500 else 2,
+        max_features=50_000,
+        dtype=np.int32
     )
     
+    if incremental and model_path is not None and model_path.exists():
+        print(f"Loading saved topic model from {model_path}")
+        topic_model = BERTopic.load(str(model_path), embedding_model=embedding_model)
+        topics, _ = topic_model.transform(prompts, embeddings)
+        # Topic sizes and representations still describe the corpus the model was fitted on
+        topic_model.update_topics(prompts, topics=topics, vectorizer_model=vectorizer_model)
+        return topic_model, topics, None
+    
+    # Use GPU UMAP/HDBSCAN when cuML is installed; None falls back to BERTopic's CPU defaults
+    umap_model = hdbscan_model = None
+    cuUMAP, cuHDBSCAN = _load_cuml()
+    if cuUMAP is not None:
+        umap_model = cuUMAP(n_components=5, n_neighbors=15, min_dist=0.0)
+        hdbscan_model = cuHDBSCAN(min_cluster_size=3, prediction_data=False)  # approximate_predict is never used
+    
     topic_model = BERTopic(
+        embedding_model=embedding_model,
+        umap_model=umap_model,
+        hdbscan_model=hdbscan_model,
         vectorizer_model=vectorizer_model,
         min_topic_size=3,  # Minimum cluster size
         nr_topics=n_topics,  # Reduce to n_topics
-        calculate_probabilities=True,
+        calculate_probabilities=False,  # Skip HDBSCAN soft-clustering; probabilities are never used
         verbose=True
     )
     
     # Fit the model
-    topics, probs = topic_model.fit_transform(prompts)
+    topics, _ = topic_model.fit_transform(prompts, embeddings=embeddings)
+    
+    # TF-IDF embeddings are refitted each run, so a saved model couldn't place new prompts
+    if model_path is not None and embedding_model is not None:
+        topic_model.save(
+            str(model_path),
+            serialization="safetensors",
+            save_ctfidf=True,
+            save_embedding_model=EMBEDDING_MODEL_NAME
+        )
+        print(f"Topic model saved to: {model_path}")
     
-    return topic_model, topics, probs
+    return topic_model, topics, None
 
 
-def classify_topic_with_o3(
-    prompts: List[str], 
-    topic_words: List[str],
-    openai_key: Optional[str] = None,
-    existing_categories: List[str] = None
-) -> str:
+@functools.lru_cache(maxsize=1)
+def _openai_client(api_key: str) -> 'OpenAI':
+    """
+    Return a shared OpenAI client for api_key, so repeated calls reuse its connection pool.
+    
+    The batched request is a single point of failure, so rate limits and transient errors are
+    retried more than the default twice; the client backs off exponentially and honors Retry-After.
     """
-    Use OpenAI's o3 model to classify the semantic meaning of a topic cluster.
+    from openai import OpenAI
+    
+    return OpenAI(api_key=api_key, max_retries=O3_MAX_RETRIES)
+
+
+def classify_topics_with_o3(
+    topic_samples: List[Tuple[List[str], List[str]]],
+    openai_key: Optional[str] = None
+) -> List[str]:
     """
+    Use OpenAI's o3 model to classify the semantic meaning of several topic clusters at once.
+    
+    topic_samples holds one (prompts, topic_words) pair per topic. All topics go into a
+    single request, so the instructions are sent (and paid for) once rather than per topic.
+    Returns one category per topic, in input order.
+    """
+    # Every prompt may be an outlier, leaving nothing worth a paid request
+    if not topic_samples:
+        return []
+    
+    fallbacks = [f"{words[0].title()} Tasks" if words else "Unknown" for _, words in topic_samples]
+    
     if not openai_key:
         openai_key = os.getenv('OPENAI_API_KEY')
     
     if not openai_key:
-        return "Classification unavailable (no OpenAI API key)"
+        return ["Classification unavailable (no OpenAI API key)"] * len(topic_samples)
     
     try:
-        client = OpenAI(api_key=openai_key)
+        client = _openai_client(openai_key)
         
-        # Simple prompt with sample prompts
-        sample_prompts = prompts[:5]
-        existing_str = ""
-        if existing_categories:
-            existing_str = f"\nAlready used categories (pick something different): {', '.join(existing_categories)}\n"
+        # One numbered section per topic with its sample prompts
+        sections = []
+        for i, (prompts, topic_words) in enumerate(topic_samples, 1):
+            sample_prompts = prompts[:5]
+            sections.append(
+                f"Topic {i} (key terms: {', '.join(topic_words[:10])}):\n"
+                + "\n".join(f"- {p[:150]}" for p in sample_prompts)
+            )
         
-        prompt = f"""Analyze these Claude session prompts to identify patterns that reveal automation opportunities or areas for improvement.
+        prompt = f"""Analyze these groups of Claude session prompts to identify patterns that reveal automation opportunities or areas for improvement.
 Focus on identifying repetitive behaviors, inefficiencies, or common workflows that teams could optimize.
-{existing_str}
+
 Look for patterns like:
 - "Repetitive debugging cycles" (same type of errors fixed repeatedly - could use automated linting)
 - "Manual file navigation" (constantly asking to find/read files - could use better project setup)
@@ -171,10 +364,11 @@ Look for patterns like:
 - "Boilerplate code requests" (asking for standard implementations - could use code generators)
 - "Knowledge gap patterns" (asking for explanations of same concepts - team training opportunity)
 
-Prompts to analyze:
-{chr(10).join(f"- {p[:150]}" for p in sample_prompts)}
+Prompt groups to analyze:
+{(chr(10) * 2).join(sections)}
 
-Return JSON with a 'category' field containing a 3-6 word pattern that suggests an automation opportunity or improvement area."""
+Return JSON with a 'categories' field: a list with one object per topic, each with a 'topic_index' (the topic number above) and a 'category' (a 3-6 word pattern that suggests an automation opportunity or improvement area).
+Return {len(topic_samples)} distinct categories."""
         
         response = client.chat.completions.create(
             model="o3",
@@ -182,7 +376,7 @@ Return JSON with a 'category' field containing a 3-6 word pattern that suggests
                 {"role": "system", "content": "You identify automation opportunities and improvement areas in developer workflows. Return JSON."},
                 {"role": "user", "content": prompt}
             ],
-            max_completion_tokens=4000,
+            max_completion_tokens=8000,
             response_format={"type": "json_object"}
         )
         
@@ -191,21 +385,24 @@ Return JSON with a 'category' field containing a 3-6 word pattern that suggests
         content = response.choices[0].message.content
         print(f"[O3] Content: {content}")
         
+        classifications = list(fallbacks)
         try:
-            parsed = json.loads(content)
-            classification = parsed.get("category", parsed.get("classification", "Unknown"))
-        except:
-            classification = content[:50] if content else "Unknown"
+            for item in json.loads(content).get("categories", []):
+                i = int(item["topic_index"]) - 1
+                if 0 <= i < len(classifications) and item.get("category"):
+                    classifications[i] = item["category"]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            print("O3 response could not be parsed; using keyword-based names")
         
-        return classification
+        return classifications
     
     except Exception as e:
         print(f"O3 failed: {e}")
-        return f"{topic_words[0].title()} Tasks"
+        return fallbacks
 
 
 def generate_report(
-    topic_model: BERTopic, 
+    topic_model: 'BERTopic', 
     prompts: List[str], 
     topics: List[int],
     metadata: List[Dict],
@@ -215,110 +412,127 @@ def generate_report(
     """
     Generate a markdown report with top prompt categories and examples.
     """
-    report_lines = []
-    report_lines.append("# Claude Prompt Analysis Report")
-    report_lines.append(f"\nGenerated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report_lines.append(f"\nTotal prompts analyzed: {len(prompts)}")
-    
-    # Get topic info
-    topic_info = topic_model.get_topic_info()
-    
-    # Filter out outlier topic (-1)
-    topic_info = topic_info[topic_info.Topic != -1]
-    
-    report_lines.append(f"\nNumber of topics identified: {len(topic_info)}")
-    report_lines.append("\n---\n")
-    
-    # Get top 5 topics for O3 classification
-    top_topics = topic_info.head(5)
-    o3_classifications = {}
-    
-    # Always try O3 classification (will use hardcoded key if no key provided)
-    report_lines.append("\n*Using O3 for semantic classification of top 5 categories...*\n")
-    
-    # Analyze each topic
-    for idx, row in topic_info.iterrows():
-        topic_id = row['Topic']
-        topic_size = row['Count']
+    # Write report lines straight to a temp file as they're produced rather than collecting them in
+    # a list, and only replace the previous report once this one is complete
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', buffering=1 << 16) as f:
+        def w(line: str):
+            f.write(line)
+            f.write("\n")
+        
+        w("# Claude Prompt Analysis Report")
+        w(f"\nGenerated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        w(f"\nTotal prompts analyzed: {len(prompts)}")
+        
+        # Get topic info
+        topic_info = topic_model.get_topic_info()
+        
+        # Filter out outlier topic (-1)
+        topic_info = topic_info[topic_info.Topic != -1]
+        
+        # Per-topic lookups, built once instead of masking the DataFrame for every query
+        topic_ids = topic_info['Topic'].tolist()
+        name_map = dict(zip(topic_ids, topic_info['Name'].tolist()))
+        count_map = dict(zip(topic_ids, topic_info['Count'].tolist()))
+        
+        w(f"\nNumber of topics identified: {len(topic_info)}")
+        w("\n---\n")
+        
+        # Get top 5 topics for O3 classification
+        top_topics = topic_info.head(5)
+        
+        # Always try O3 classification (will use hardcoded key if no key provided)
+        w("\n*Using O3 for semantic classification of top 5 categories...*\n")
+        
+        # Group prompts (with their metadata) by topic in one pass instead of rescanning them per topic
+        by_topic = defaultdict(list)
+        for p, m, t in zip(prompts, metadata, topics):
+            by_topic[t].append((p, m))
         
-        # Get O3 classification for top 5 topics
-        topic_name = row['Name']
-        if idx < 5:
+        # Classify the top 5 topics with a single O3 request
+        topic_samples = []
+        for topic_id in top_topics['Topic']:
             # Get prompts for this topic
-            topic_prompt_texts = [p for p, t in zip(prompts, topics) if t == topic_id]
+            topic_prompt_texts = [p for p, _ in by_topic[topic_id]]
             # Get top words
             words = topic_model.get_topic(topic_id)
             top_words = [word for word, _ in words[:10]] if words else []
+            topic_samples.append((topic_prompt_texts, top_words))
+        
+        o3_classifications = dict(zip(top_topics['Topic'], classify_topics_with_o3(topic_samples, openai_key)))
+        
+        # Analyze each topic
+        for idx, row in topic_info.iterrows():
+            topic_id = row['Topic']
+            topic_size = row['Count']
             
-            # Classify with O3
-            existing = list(o3_classifications.values())
-            o3_classification = classify_topic_with_o3(topic_prompt_texts, top_words, openai_key, existing)
-            o3_classifications[topic_id] = o3_classification
-            topic_name = f"{o3_classification} (BERTopic: {row['Name']})"
-        
-        report_lines.append(f"## Topic {idx + 1}: {topic_name}")
-        report_lines.append(f"\n**Number of prompts:** {topic_size}")
-        report_lines.append(f"\n**Percentage of total:** {(topic_size / len(prompts) * 100):.1f}%")
-        
-        # Get top words for this topic
-        words = topic_model.get_topic(topic_id)
-        if words:
-            top_words = [word for word, _ in words[:10]]
-            report_lines.append(f"\n**Key terms:** {', '.join(top_words)}")
-        
-        # Get example prompts for this topic
-        topic_prompts = [(p, m) for p, m, t in zip(prompts, metadata, topics) if t == topic_id]
-        
-        report_lines.append("\n**Example prompts:**")
-        # Show up to 3 examples
-        for i, (prompt, meta) in enumerate(topic_prompts[:3]):
-            # Truncate long prompts for display
-            display_prompt = prompt if len(prompt) <= 200 else prompt[:200] + "..."
-            report_lines.append(f"\n{i + 1}. \"{display_prompt}\"")
-            if meta.get('timestamp'):
-                report_lines.append(f"   - *Timestamp: {meta['timestamp']}*")
-        
-        report_lines.append("\n---\n")
-    
-    # Add outliers section if any
-    outlier_count = sum(1 for t in topics if t == -1)
-    if outlier_count > 0:
-        report_lines.append(f"## Uncategorized Prompts")
-        report_lines.append(f"\n**Count:** {outlier_count} ({(outlier_count / len(prompts) * 100):.1f}%)")
-        report_lines.append("\nThese prompts didn't fit well into any major category.")
-        report_lines.append("\n---\n")
-    
-    # Add O3 classifications summary if available
-    if o3_classifications:
-        report_lines.append("## O3 Semantic Classifications Summary")
-        report_lines.append("\n**Top 5 Categories:**")
-        for idx, (topic_id, classification) in enumerate(o3_classifications.items()):
-            topic_size = topic_info[topic_info.Topic == topic_id]['Count'].iloc[0]
-            percentage = (topic_size / len(prompts) * 100)
-            report_lines.append(f"{idx + 1}. **{classification}** - {topic_size} prompts ({percentage:.1f}%)")
-        report_lines.append("\n---\n")
-    
-    # Add summary statistics
-    report_lines.append("## Summary Statistics")
-    
-    # Calculate prompt length distribution
-    prompt_lengths = [len(p.split()) for p in prompts]
-    report_lines.append(f"\n- **Average prompt length:** {sum(prompt_lengths) / len(prompt_lengths):.1f} words")
-    report_lines.append(f"- **Shortest prompt:** {min(prompt_lengths)} words")
-    report_lines.append(f"- **Longest prompt:** {max(prompt_lengths)} words")
-    
-    # Session distribution
-    sessions = defaultdict(int)
-    for meta in metadata:
-        if meta.get('session_id'):
-            sessions[meta['session_id']] += 1
-    
-    report_lines.append(f"\n- **Number of sessions:** {len(sessions)}")
-    report_lines.append(f"- **Average prompts per session:** {len(prompts) / len(sessions):.1f}")
-    
-    # Save report
-    with open(output_file, 'w') as f:
-        f.write('\n'.join(report_lines))
+            # Use the O3 classification for top 5 topics
+            topic_name = row['Name']
+            if topic_id in o3_classifications:
+                topic_name = f"{o3_classifications[topic_id]} (BERTopic: {row['Name']})"
+            
+            w(f"## Topic {idx + 1}: {topic_name}")
+            w(f"\n**Number of prompts:** {topic_size}")
+            w(f"\n**Percentage of total:** {(topic_size / len(prompts) * 100):.1f}%")
+            
+            # Get top words for this topic
+            words = topic_model.get_topic(topic_id)
+            if words:
+                top_words = [word for word, _ in words[:10]]
+                w(f"\n**Key terms:** {', '.join(top_words)}")
+            
+            # Get example prompts for this topic
+            topic_prompts = by_topic[topic_id]
+            
+            w("\n**Example prompts:**")
+            # Show up to 3 examples
+            for i, (prompt, meta) in enumerate(topic_prompts[:3]):
+                # Truncate long prompts for display
+                display_prompt = prompt if len(prompt) <= 200 else prompt[:200] + "..."
+                w(f"\n{i + 1}. \"{display_prompt}\"")
+                if meta.get('timestamp'):
+                    w(f"   - *Timestamp: {meta['timestamp']}*")
+            
+            w("\n---\n")
+        
+        # Add outliers section if any
+        outlier_count = sum(1 for t in topics if t == -1)
+        if outlier_count > 0:
+            w(f"## Uncategorized Prompts")
+            w(f"\n**Count:** {outlier_count} ({(outlier_count / len(prompts) * 100):.1f}%)")
+            w("\nThese prompts didn't fit well into any major category.")
+            w("\n---\n")
+        
+        # Add O3 classifications summary if available
+        if o3_classifications:
+            w("## O3 Semantic Classifications Summary")
+            w("\n**Top 5 Categories:**")
+            for idx, (topic_id, classification) in enumerate(o3_classifications.items()):
+                topic_size = count_map[topic_id]
+                percentage = (topic_size / len(prompts) * 100)
+                w(f"{idx + 1}. **{classification}** - {topic_size} prompts ({percentage:.1f}%)")
+            w("\n---\n")
+        
+        # Add summary statistics
+        w("## Summary Statistics")
+        
+        # Calculate prompt length distribution. Prompts are whitespace-normalized by clean_prompts,
+        # so counting single spaces gives the word count without splitting each prompt.
+        prompt_lengths = np.fromiter((p.count(' ') + 1 for p in prompts), dtype=np.int32, count=len(prompts))
+        w(f"\n- **Average prompt length:** {prompt_lengths.mean():.1f} words")
+        w(f"- **Shortest prompt:** {prompt_lengths.min()} words")
+        w(f"- **Longest prompt:** {prompt_lengths.max()} words")
+        
+        # Session distribution
+        sessions = defaultdict(int)
+        for meta in metadata:
+            if meta.get('session_id'):
+                sessions[meta['session_id']] += 1
+        
+        w(f"\n- **Number of sessions:** {len(sessions)}")
+        w(f"- **Average prompts per session:** {len(prompts) / len(sessions):.1f}")
+    
+    os.replace(tmp_file, output_file)
     
     print(f"\nReport saved to: {output_file}")
     
@@ -331,13 +545,12 @@ def generate_report(
         }
         
         for topic_id, classification in o3_classifications.items():
-            topic_data = topic_info[topic_info.Topic == topic_id].iloc[0]
             o3_data['classifications'].append({
                 'topic_id': int(topic_id),
                 'o3_classification': classification,
-                'bertopic_name': topic_data['Name'],
-                'prompt_count': int(topic_data['Count']),
-                'percentage': float(topic_data['Count'] / len(prompts) * 100)
+                'bertopic_name': name_map[topic_id],
+                'prompt_count': int(count_map[topic_id]),
+                'percentage': float(count_map[topic_id] / len(prompts) * 100)
             })
         
         with open(o3_file, 'w') as f:
@@ -345,30 +558,49 @@ def generate_report(
         
         print(f"O3 classifications saved to: {o3_file}")
     
-    # Also save a CSV with all prompts and their topics
-    df = pd.DataFrame({
-        'prompt': prompts,
-        'topic': topics,
-        'topic_name': [topic_info[topic_info.Topic == t]['Name'].iloc[0] if t != -1 else 'Uncategorized' 
-                       for t in topics],
-        'session_id': [m.get('session_id', '') for m in metadata],
-        'timestamp': [m.get('timestamp', '') for m in metadata]
-    })
-    
+    # Also save a CSV with all prompts and their topics, streamed row by row
     csv_file = output_file.replace('.md', '_detailed.csv')
-    df.to_csv(csv_file, index=False)
+    with open(csv_file, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')  # Match the '\n' rows pandas' to_csv wrote
+        writer.writerow(['prompt', 'topic', 'topic_name', 'session_id', 'timestamp'])
+        writer.writerows(
+            (p, t, name_map.get(t, 'Uncategorized'), m.get('session_id', ''), m.get('timestamp', ''))
+            for p, t, m in zip(prompts, topics, metadata)
+        )
     print(f"Detailed results saved to: {csv_file}")
 
 
+def _walk(root: str) -> Iterator[os.DirEntry]:
+    """
+    Recursively yield the file entries under root using os.scandir.
+    """
+    # Skip unreadable directories, as Path.glob did, rather than aborting the whole walk
+    try:
+        it = os.scandir(root)
+    except PermissionError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            else:
+                yield entry
+
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze Claude session logs for prompt patterns')
     parser.add_argument('log_path', help='Path to log files or directory containing logs')
     parser.add_argument('--output', default='prompt_analysis_report.md', help='Output report filename')
     parser.add_argument('--topics', type=int, default=10, help='Number of topics to identify')
     parser.add_argument('--openai-key', help='OpenAI API key for O3 classification (optional)')
+    parser.add_argument('--cpu-fast', action='store_true', help='Use TF-IDF embeddings instead of a sentence transformer (fast on CPU)')
+    parser.add_argument('--incremental', action='store_true', help='Assign prompts to the topics of the model saved by a previous run instead of refitting')
     
     args = parser.parse_args()
     
+    if args.incremental and args.cpu_fast:
+        parser.error("--incremental needs sentence-transformer embeddings and can't be combined with --cpu-fast")
+    
     # Collect log files
     log_files = []
     path = Path(args.log_path)
@@ -376,9 +608,8 @@ def main():
     if path.is_file():
         log_files = [str(path)]
     elif path.is_dir():
-        # Find all .jsonl and .json files
-        log_files = list(str(p) for p in path.glob('**/*.jsonl'))
-        log_files.extend(str(p) for p in path.glob('**/*.json'))
+        # Find all .jsonl and .json files in one walk
+        log_files = [entry.path for entry in _walk(str(path)) if entry.name.endswith(('.jsonl', '.json'))]
     else:
         print(f"Error: {args.log_path} not found")
         return
@@ -408,7 +639,13 @@ def main():
     
     # Run BERTopic analysis
     print(f"\nClustering prompts into {args.topics} topics...")
-    topic_model, topics, probs = analyze_prompts_with_bertopic(cleaned_prompts, n_topics=args.topics)
+    topic_model, topics, probs = analyze_prompts_with_bertopic(
+        cleaned_prompts,
+        n_topics=args.topics,
+        cpu_fast=args.cpu_fast,
+        model_path=Path(args.output).with_suffix('.bertopic'),
+        incremental=args.incremental
+    )
     
     # Generate report
     print("\nGenerating report...")